@@ -10,18 +10,9 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import sys
-import os
-
-# Add utils to path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
 
 try:
-    from data_prep import DataProcessor
-    from recommender import FreshCartRecommender
-    from visualizations import FreshCartVisualizer
+    from utils import DataProcessor, FreshCartRecommender, FreshCartVisualizer
 except ImportError as e:
     st.error(f"Import error: {str(e)}")
     st.error("Please ensure all required files are present in the utils directory.")
@@ -36,7 +27,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -52,6 +43,13 @@ st.markdown("""
         margin-top: 2rem;
         margin-bottom: 1rem;
     }
+    .kpi-row {
+        display: flex;
+        gap: 1rem;
+    }
+    .kpi-row .kpi-card {
+        flex: 1;
+    }
     .kpi-card {
         background-color: #f8f9fa;
         padding: 1rem;
@@ -93,25 +91,62 @@ st.markdown("""
         float: right;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-@st.cache_data
+@st.cache_resource
+def inject_custom_css():
+    """Inject the custom CSS (cached elements are replayed on every rerun)"""
+    st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+    return True
+
+# Directory for fitted model files
+MODEL_DIR = "model_cache"
+# Directory for pre-rendered chart JSON
+CHART_DIR = f"{MODEL_DIR}/charts"
+
+@st.cache_resource
 def load_data():
     """Load and cache data processing components"""
     try:
         data_processor = DataProcessor()
         data_processor.load_data()
         
+        # Reuse saved model files when they match the current data, otherwise refit
         recommender = FreshCartRecommender(data_processor)
-        recommender.fit()
+        if not recommender.load(MODEL_DIR):
+            recommender.fit()
+            try:
+                recommender.save(MODEL_DIR)
+            except OSError:
+                pass  # Read-only deployments just refit on the next start
         
         visualizer = FreshCartVisualizer(data_processor)
+        if visualizer.load_warm_figure(CHART_DIR, FreshCartVisualizer.WARM_CHARTS[0]) is None:
+            try:
+                visualizer.warm_cache(CHART_DIR)
+            except Exception:
+                pass  # Best effort: charts are then built on first view instead
         
-        return data_processor, recommender, visualizer
+        # Product and category lists used by the selection widgets
+        all_products = list(data_processor.product_categories.keys())
+        # Sorted tuple keeps the option order deterministic across reruns
+        all_categories = ("All",) + tuple(sorted(set(data_processor.product_categories.values())))
+        
+        return data_processor, recommender, visualizer, all_products, all_categories
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         st.error("Please ensure the transaction data file exists in the sample_data directory.")
-        return None, None, None
+        return None, None, None, None, None
+
+@st.cache_data
+def get_insights_cached(_data_processor):
+    """Cached global insights"""
+    return _data_processor.get_global_insights()
+
+@st.cache_data
+def get_sorted_customer_ids(_data_processor):
+    """Cached sorted array of customer IDs"""
+    return np.sort(_data_processor.df['CustomerID'].unique())
 
 @st.cache_data
 def get_product_recommendations_cached(_recommender, product, method, n_recommendations):
@@ -136,6 +171,63 @@ def get_popular_products_cached(_recommender, n_products, category=None):
     else:
         return _recommender.get_popular_products(n_products)
 
+@st.cache_data
+def get_top_products_chart_cached(_visualizer, n_products):
+    """Cached top products chart"""
+    return _visualizer.create_top_products_chart(n_products)
+
+@st.cache_data
+def get_category_distribution_chart_cached(_visualizer):
+    """Cached category distribution chart"""
+    return _visualizer.warm_figure(CHART_DIR, 'create_category_distribution_chart')
+
+@st.cache_data
+def get_basket_size_distribution_cached(_visualizer):
+    """Cached basket size distribution chart"""
+    return _visualizer.warm_figure(CHART_DIR, 'create_basket_size_distribution')
+
+@st.cache_data
+def get_cooccurrence_heatmap_cached(_visualizer, top_n):
+    """Cached co-occurrence heatmap"""
+    return _visualizer.create_cooccurrence_heatmap(top_n)
+
+@st.cache_data
+def get_monthly_trends_cached(_visualizer):
+    """Cached monthly trends chart"""
+    return _visualizer.warm_figure(CHART_DIR, 'create_monthly_trends')
+
+@st.cache_data
+def get_category_performance_cached(_visualizer):
+    """Cached category performance chart"""
+    return _visualizer.warm_figure(CHART_DIR, 'create_category_performance')
+
+@st.cache_data
+def get_network_graph_cached(_visualizer, min_cooccurrence):
+    """Cached product network graph"""
+    return _visualizer.create_network_graph(min_cooccurrence)
+
+@st.cache_data
+def get_frequently_bought_chart_cached(_data_processor, min_cooccurrence):
+    """Cached frequently bought together bar chart (None if no pairs qualify)"""
+    frequently_bought = _data_processor.get_frequently_bought_together(min_cooccurrence)
+    if frequently_bought.empty:
+        return None
+    
+    fig = px.bar(
+        frequently_bought.head(10),
+        x='Cooccurrence',
+        y='Product1',
+        orientation='h',
+        title='Frequently Bought Together Products',
+        labels={'Cooccurrence': 'Times Bought Together', 'Product1': 'Product'}
+    )
+    fig.update_layout(
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
 def display_kpi_cards(insights):
     """Display KPI cards"""
     kpis = [
@@ -165,16 +257,14 @@ def display_kpi_cards(insights):
         }
     ]
     
-    cols = st.columns(4)
-    for i, kpi in enumerate(kpis):
-        with cols[i]:
-            st.markdown(f"""
-            <div class="kpi-card">
-                <h3 style="margin: 0; color: #2E8B57;">{kpi['icon']} {kpi['value']}</h3>
-                <p style="margin: 0.5rem 0 0 0; font-weight: bold;">{kpi['title']}</p>
-                <p style="margin: 0; font-size: 0.9rem; color: #6c757d;">{kpi['description']}</p>
-            </div>
-            """, unsafe_allow_html=True)
+    # Emit all cards as a single flex row
+    cards_html = "".join(f"""
+        <div class="kpi-card">
+            <h3 style="margin: 0; color: #2E8B57;">{kpi['icon']} {kpi['value']}</h3>
+            <p style="margin: 0.5rem 0 0 0; font-weight: bold;">{kpi['title']}</p>
+            <p style="margin: 0; font-size: 0.9rem; color: #6c757d;">{kpi['description']}</p>
+        </div>""" for kpi in kpis)
+    st.markdown(f'<div class="kpi-row">{cards_html}\n</div>', unsafe_allow_html=True)
 
 def display_recommendation_cards(recommendations, title="Recommendations", data_processor=None):
     """Display recommendation cards"""
@@ -182,18 +272,20 @@ def display_recommendation_cards(recommendations, title="Recommendations", data_
         st.info("No recommendations available.")
         return
     
-    st.markdown(f"<div class='sub-header'>{title}</div>", unsafe_allow_html=True)
+    cards = [f"<div class='sub-header'>{title}</div>"]
     
-    for i, rec in enumerate(recommendations[:5]):  # Show top 5
+    for rec in recommendations[:5]:  # Show top 5
         product = rec['product']
         score = rec['score']
         method = rec['method']
         
-        # Get category
-        if data_processor:
-            category = data_processor.product_categories.get(product, 'Unknown')
-        else:
-            category = 'Unknown'
+        # Category is attached by the recommender; look it up only as a fallback
+        category = rec.get('category')
+        if category is None:
+            if data_processor:
+                category = data_processor.product_categories.get(product, 'Unknown')
+            else:
+                category = 'Unknown'
         
         # Format score based on method
         if method in ['similarity', 'hybrid']:
@@ -201,32 +293,43 @@ def display_recommendation_cards(recommendations, title="Recommendations", data_
         else:
             score_text = f"{score:.0f}"
         
-        st.markdown(f"""
-        <div class="recommendation-card">
+        cards.append(f"""<div class="recommendation-card">
             <div class="product-name">{product}</div>
             <span class="category-badge">{category}</span>
             <span class="score-badge">{score_text}</span>
             <div style="clear: both; margin-top: 0.5rem;">
                 <small style="color: #6c757d;">Method: {method.title()}</small>
             </div>
-        </div>
-        """, unsafe_allow_html=True)
+        </div>""")
+    
+    # Render the header and all cards in one update
+    st.markdown("\n".join(cards), unsafe_allow_html=True)
+
+def display_frequently_bought_chart(data_processor):
+    """Display frequently bought together chart as a network graph alternative"""
+    fig = get_frequently_bought_chart_cached(data_processor, 10)
+    if fig is not None:
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No frequently bought together products found.")
 
 def main():
     """Main application function"""
+    inject_custom_css()
+    
     # Header
     st.markdown('<div class="main-header">🛒 FreshCart</div>', unsafe_allow_html=True)
     st.markdown('<div style="text-align: center; font-size: 1.2rem; color: #6c757d; margin-bottom: 2rem;">AI-Powered Product Recommendation System</div>', unsafe_allow_html=True)
     
     # Load data
     with st.spinner("Loading FreshCart data and models..."):
-        data_processor, recommender, visualizer = load_data()
+        data_processor, recommender, visualizer, all_products, all_categories = load_data()
     
     if data_processor is None:
         st.stop()
     
     # Get insights
-    insights = data_processor.get_global_insights()
+    insights = get_insights_cached(data_processor)
     
     # Main tabs
     tab1, tab2, tab3 = st.tabs(["📊 Global Insights", "🔍 Recommendation Explorer", "🛒 Basket Simulation"])
@@ -241,74 +344,40 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            st.plotly_chart(visualizer.create_top_products_chart(10), use_container_width=True)
+            st.plotly_chart(get_top_products_chart_cached(visualizer, 10), use_container_width=True)
         
         with col2:
-            st.plotly_chart(visualizer.create_category_distribution_chart(), use_container_width=True)
+            st.plotly_chart(get_category_distribution_chart_cached(visualizer), use_container_width=True)
         
         # Additional charts
-        st.plotly_chart(visualizer.create_basket_size_distribution(), use_container_width=True)
+        st.plotly_chart(get_basket_size_distribution_cached(visualizer), use_container_width=True)
         
         # Network graph with improved error handling
         try:
-            network_fig = visualizer.create_network_graph(15)
+            network_fig = get_network_graph_cached(visualizer, 15)
             # Check if the figure has any data (not just error messages)
             if network_fig.data and len(network_fig.data) > 0:
                 st.plotly_chart(network_fig, use_container_width=True)
             else:
                 st.warning("Network graph data not available. Showing alternative visualization.")
                 # Show a simple bar chart of frequently bought together products instead
-                frequently_bought = data_processor.get_frequently_bought_together(10)
-                if not frequently_bought.empty:
-                    fig = px.bar(
-                        frequently_bought.head(10),
-                        x='Cooccurrence',
-                        y='Product1',
-                        orientation='h',
-                        title='Frequently Bought Together Products',
-                        labels={'Cooccurrence': 'Times Bought Together', 'Product1': 'Product'}
-                    )
-                    fig.update_layout(
-                        height=400,
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("No frequently bought together products found.")
+                display_frequently_bought_chart(data_processor)
         except Exception as e:
             st.warning(f"Network graph temporarily unavailable: {str(e)[:100]}...")
             # Show a simple bar chart of frequently bought together products instead
             try:
-                frequently_bought = data_processor.get_frequently_bought_together(10)
-                if not frequently_bought.empty:
-                    fig = px.bar(
-                        frequently_bought.head(10),
-                        x='Cooccurrence',
-                        y='Product1',
-                        orientation='h',
-                        title='Frequently Bought Together Products',
-                        labels={'Cooccurrence': 'Times Bought Together', 'Product1': 'Product'}
-                    )
-                    fig.update_layout(
-                        height=400,
-                        plot_bgcolor='rgba(0,0,0,0)',
-                        paper_bgcolor='rgba(0,0,0,0)'
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info("No frequently bought together products found.")
+                display_frequently_bought_chart(data_processor)
             except Exception as e2:
                 st.error(f"Unable to create alternative visualization: {str(e2)[:100]}...")
         
         # Co-occurrence heatmap
-        st.plotly_chart(visualizer.create_cooccurrence_heatmap(10), use_container_width=True)
+        st.plotly_chart(get_cooccurrence_heatmap_cached(visualizer, 10), use_container_width=True)
         
         # Monthly trends
-        st.plotly_chart(visualizer.create_monthly_trends(), use_container_width=True)
+        st.plotly_chart(get_monthly_trends_cached(visualizer), use_container_width=True)
         
         # Category performance
-        st.plotly_chart(visualizer.create_category_performance(), use_container_width=True)
+        st.plotly_chart(get_category_performance_cached(visualizer), use_container_width=True)
     
     with tab2:
         st.markdown('<div class="sub-header">🔍 Recommendation Explorer</div>', unsafe_allow_html=True)
@@ -317,8 +386,6 @@ def main():
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Get all products
-            all_products = list(data_processor.product_categories.keys())
             selected_product = st.selectbox(
                 "Select a product to get recommendations:",
                 all_products,
@@ -357,10 +424,10 @@ def main():
         st.markdown('<div class="sub-header">👤 Customer-Based Recommendations</div>', unsafe_allow_html=True)
         
         # Customer selection
-        customer_ids = data_processor.df['CustomerID'].unique()
+        customer_ids = get_sorted_customer_ids(data_processor)
         selected_customer = st.selectbox(
             "Select a customer ID:",
-            sorted(customer_ids),
+            customer_ids,
             index=0
         )
         
@@ -375,11 +442,13 @@ def main():
             customer_history = data_processor.get_customer_purchase_history(selected_customer)
             
             if not customer_history.empty:
-                # Group by date for better display
-                history_summary = customer_history.groupby('Date').agg({
-                    'Product': lambda x: ', '.join(x),
-                    'Category': lambda x: ', '.join(x.unique())
-                }).reset_index()
+                # Group by date for better display (history is already sorted by date)
+                products_by_date = customer_history.groupby('Date', sort=False)['Product'].agg(', '.join)
+                categories_by_date = (
+                    customer_history.drop_duplicates(['Date', 'Category'])
+                    .groupby('Date', sort=False)['Category'].agg(', '.join)
+                )
+                history_summary = pd.concat([products_by_date, categories_by_date], axis=1).reset_index()
                 
                 st.dataframe(
                     history_summary,
@@ -400,8 +469,6 @@ def main():
         """, unsafe_allow_html=True)
         
         # Product selection for basket
-        all_products = list(data_processor.product_categories.keys())
-        
         col1, col2 = st.columns([2, 1])
         
         with col1:
@@ -422,16 +489,15 @@ def main():
         
         # Display current basket
         if selected_products:
-            st.markdown('<div class="sub-header">🛒 Your Current Basket</div>', unsafe_allow_html=True)
-            
-            for product in selected_products:
-                category = data_processor.product_categories.get(product, 'Unknown')
-                st.markdown(f"""
-                <div class="recommendation-card">
-                    <div class="product-name">{product}</div>
-                    <span class="category-badge">{category}</span>
-                </div>
-                """, unsafe_allow_html=True)
+            categories = data_processor.product_categories
+            basket_html = "\n".join(f"""<div class="recommendation-card">
+                <div class="product-name">{product}</div>
+                <span class="category-badge">{categories.get(product, 'Unknown')}</span>
+            </div>""" for product in selected_products)
+            st.markdown(
+                f'<div class="sub-header">🛒 Your Current Basket</div>\n{basket_html}',
+                unsafe_allow_html=True
+            )
             
             # Get basket recommendations
             with st.spinner("Analyzing your basket and generating recommendations..."):
@@ -462,7 +528,7 @@ def main():
         with col1:
             category_filter = st.selectbox(
                 "Filter by category:",
-                ["All"] + list(set(data_processor.product_categories.values())),
+                all_categories,
                 key="popular_category"
             )
         
@@ -47,10 +47,7 @@ def test_imports():
     """Test if all modules can be imported"""
     print("🧪 Testing imports...")
     try:
-        sys.path.append('utils')
-        from data_prep import DataProcessor
-        from recommender import FreshCartRecommender
-        from visualizations import FreshCartVisualizer
+        from utils import DataProcessor, FreshCartRecommender, FreshCartVisualizer
         print("✅ All imports successful")
         return True
     except ImportError as e:
@@ -61,9 +58,7 @@ def test_application():
     """Test the application components"""
     print("🧪 Testing application components...")
     try:
-        sys.path.append('utils')
-        from data_prep import DataProcessor
-        from recommender import FreshCartRecommender
+        from utils import DataProcessor, FreshCartRecommender
         
         # Test data loading
         dp = DataProcessor()
@@ -76,7 +71,7 @@ def test_application():
         print("✅ Recommendation engine test passed")
         
         # Test visualizations
-        from visualizations import FreshCartVisualizer
+        from utils import FreshCartVisualizer
         viz = FreshCartVisualizer(dp)
         print("✅ Visualization test passed")
         
@@ -6,11 +6,6 @@ This file is used by Streamlit Cloud to run the application.
 """
 
 import streamlit as st
-import sys
-import os
-
-# Add utils to path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
 
 try:
     # Import and run the main application
@@ -47,10 +47,7 @@ def test_data_file():
 def test_utils_imports():
     """Test if utils modules can be imported"""
     try:
-        sys.path.append('utils')
-        from data_prep import DataProcessor
-        from recommender import FreshCartRecommender
-        from visualizations import FreshCartVisualizer
+        from utils import DataProcessor, FreshCartRecommender, FreshCartVisualizer
         print("✅ Utils modules imported successfully")
         return True
     except ImportError as e:
@@ -0,0 +1,12 @@
+"""
+FreshCart Utilities
+
+Data processing, recommendation and visualization components
+for the FreshCart recommendation system.
+"""
+
+from .data_prep import DataProcessor
+from .recommender import FreshCartRecommender
+from .visualizations import FreshCartVisualizer
+
+__all__ = ['DataProcessor', 'FreshCartRecommender', 'FreshCartVisualizer']
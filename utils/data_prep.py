@@ -9,7 +9,7 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import os
-from functools import lru_cache
+from scipy.sparse import csr_matrix, coo_matrix, triu
 
 class DataProcessor:
     """Handles data loading and preprocessing for the recommendation system"""
@@ -17,6 +17,13 @@ class DataProcessor:
     def __init__(self, data_path='sample_data/transactions.csv'):
         self.data_path = data_path
         self.df = None
+        self._cooccurrence_matrix = None
+        self._cooccurrence_pairs = None
+        self._product_stats = None
+        self._global_insights = None
+        self._customer_indices = None
+        self._category_sizes = None
+        self.version = 0  # Bumped on every load so downstream caches can tell the data changed
         self.product_categories = {
             'Pasta (500g pack)': 'Groceries & Pantry',
             'Tomato Sauce (jar)': 'Groceries & Pantry', 
@@ -45,11 +52,37 @@ class DataProcessor:
         if not os.path.exists(self.data_path):
             raise FileNotFoundError(f"Data file not found: {self.data_path}")
         
-        self.df = pd.read_csv(self.data_path)
-        self.df['Date'] = pd.to_datetime(self.df['Date'])
-        
-        # Add product categories
-        self.df['Category'] = self.df['Product'].map(self.product_categories)
+        # Categorical product column stores small integer codes instead of strings
+        self.df = pd.read_csv(
+            self.data_path,
+            dtype={'CustomerID': 'int32', 'Product': 'category'},
+            parse_dates=['Date']
+        )
+        # Keep rows in date order so date ranges can be located by binary search
+        self.df = self.df.sort_values('Date', kind='stable', ignore_index=True)
+        self._cooccurrence_matrix = None
+        self._cooccurrence_pairs = None
+        self._product_stats = None
+        self._global_insights = None
+        self._customer_indices = None
+        self.version += 1
+        
+        # Add product categories: map once per distinct product and broadcast through the product codes
+        product_codes = self.df['Product'].cat.codes.to_numpy()
+        category_codes, category_names = pd.factorize(
+            [self.product_categories.get(product) for product in self.df['Product'].cat.categories],
+            sort=True
+        )
+        self.df['Category'] = pd.Categorical.from_codes(
+            np.where(product_codes >= 0, category_codes[product_codes], -1),
+            categories=category_names
+        )
+        
+        # Number of distinct products per category, largest first
+        self._category_sizes = pd.Series(
+            np.bincount(category_codes[category_codes >= 0], minlength=len(category_names)),
+            index=pd.Index(category_names, name='Category')
+        ).sort_values(ascending=False, kind='stable')
         
         print(f"Loaded {len(self.df):,} transactions from {self.df['Date'].min().date()} to {self.df['Date'].max().date()}")
         print(f"Unique customers: {self.df['CustomerID'].nunique():,}")
@@ -63,54 +96,89 @@ class DataProcessor:
             self.load_data()
         
         # Group by customer and date to create baskets
-        baskets = self.df.groupby(['CustomerID', 'Date'])['Product'].apply(list).reset_index()
-        baskets.columns = ['CustomerID', 'Date', 'Products']
-        baskets['BasketSize'] = baskets['Products'].apply(len)
+        grouped = self.df.groupby(['CustomerID', 'Date'], sort=False, observed=True)
+        baskets = grouped['Product'].agg(list).to_frame('Products')
+        baskets['BasketSize'] = grouped.size()
+        baskets = baskets.reset_index()
         
         return baskets
     
+    def get_category_sizes(self):
+        """Number of distinct products in each category, largest first"""
+        if self.df is None:
+            self.load_data()
+        
+        return self._category_sizes
+    
+    def get_source_signature(self):
+        """Size and modification time of the transaction file, used to tell if saved artifacts are stale"""
+        stat = os.stat(self.data_path)
+        return [stat.st_size, stat.st_mtime_ns]
+    
     def get_customer_product_matrix(self):
-        """Create customer-product interaction matrix for collaborative filtering"""
+        """
+        Create customer-product interaction matrix for collaborative filtering
+        
+        Returns:
+            Sparse binary CSR matrix (customers x products), customer index, product index
+        """
         if self.df is None:
             self.load_data()
         
+        customer_codes, customers = pd.factorize(self.df['CustomerID'], sort=True)
+        product_codes, products = pd.factorize(self.df['Product'], sort=True)
+        
         # Create binary matrix (1 if customer bought product, 0 otherwise)
-        matrix = self.df.groupby(['CustomerID', 'Product']).size().unstack(fill_value=0)
-        matrix = (matrix > 0).astype(int)  # Convert to binary
+        matrix = csr_matrix(
+            (np.ones(len(customer_codes), dtype=np.float32), (customer_codes, product_codes)),
+            shape=(len(customers), len(products))
+        )
+        matrix.data[:] = 1  # Repeat purchases were summed; clip in place without a copy
         
-        return matrix
+        return matrix, customers, products
     
     def get_product_cooccurrence_matrix(self):
         """Create product co-occurrence matrix based on baskets"""
-        baskets = self.get_basket_data()
-        
-        # Flatten all products from all baskets
-        all_products = []
-        for products in baskets['Products']:
-            all_products.extend(products)
-        
-        # Get unique products
-        unique_products = list(set(all_products))
-        
-        # Initialize co-occurrence matrix
-        cooccurrence_matrix = pd.DataFrame(0, index=unique_products, columns=unique_products)
+        if self._cooccurrence_matrix is not None:
+            return self._cooccurrence_matrix
         
-        # Count co-occurrences
-        for products in baskets['Products']:
-            for i, product1 in enumerate(products):
-                for j, product2 in enumerate(products):
-                    if i != j:  # Don't count self-co-occurrence
-                        cooccurrence_matrix.loc[product1, product2] += 1
+        if self.df is None:
+            self.load_data()
         
-        return cooccurrence_matrix
+        # Sparse basket x product incidence matrix (repeated items are summed)
+        basket_ids = self.df.groupby(['CustomerID', 'Date'], sort=False).ngroup().to_numpy()
+        products = pd.Categorical(self.df['Product'])
+        incidence = csr_matrix(
+            (np.ones(len(basket_ids), dtype=np.int64), (basket_ids, products.codes)),
+            shape=(basket_ids.max() + 1, len(products.categories))
+        )
+        
+        # Count co-occurrences in one sparse product
+        cooccurrence = (incidence.T @ incidence).toarray()
+        
+        # Don't count self-co-occurrence: an item appearing n times in a basket
+        # pairs with its other n - 1 copies, giving n * (n - 1) rather than n * n
+        occurrences = np.asarray(incidence.sum(axis=0)).ravel()
+        np.fill_diagonal(cooccurrence, cooccurrence.diagonal() - occurrences)
+        
+        # Counts fit comfortably in int32, which halves the matrix and anything serialized from it
+        self._cooccurrence_matrix = pd.DataFrame(
+            cooccurrence.astype(np.int32),
+            index=products.categories,
+            columns=products.categories
+        )
+        
+        return self._cooccurrence_matrix
     
-    @lru_cache(maxsize=1)
     def get_product_stats(self):
         """Get comprehensive product statistics"""
+        if self._product_stats is not None:
+            return self._product_stats
+        
         if self.df is None:
             self.load_data()
         
-        stats = self.df.groupby('Product').agg({
+        stats = self.df.groupby('Product', observed=True).agg({
             'CustomerID': ['count', 'nunique'],
             'Date': ['min', 'max']
         }).round(2)
@@ -119,10 +187,10 @@ class DataProcessor:
         stats['Category'] = stats.index.map(self.product_categories)
         stats['AvgTransactionsPerCustomer'] = (stats['TotalTransactions'] / stats['UniqueCustomers']).round(2)
         
-        # Sort by total transactions
-        stats = stats.sort_values('TotalTransactions', ascending=False)
+        # Sort by total transactions once (stable, so ties keep product order)
+        self._product_stats = stats.sort_values('TotalTransactions', ascending=False, kind='stable')
         
-        return stats
+        return self._product_stats
     
     def get_customer_stats(self):
         """Get customer-level statistics"""
@@ -139,51 +207,71 @@ class DataProcessor:
         
         return customer_stats
     
-    def get_time_series_data(self, frequency='M'):
-        """Get time series data for trend analysis"""
+    def get_time_series_data(self, frequency='M', products=None):
+        """
+        Get time series data for trend analysis
+        
+        Args:
+            frequency: Pandas offset alias for the time buckets
+            products: Optional list of products; only their rows are aggregated
+                and the columns come back in this order
+        """
         if self.df is None:
             self.load_data()
         
+        data = self.df
+        if products is not None:
+            data = data[data['Product'].isin(products)]
+        
         # Group by date and product
-        time_series = self.df.groupby([pd.Grouper(key='Date', freq=frequency), 'Product']).size().unstack(fill_value=0)
+        time_series = (
+            data.set_index('Date')
+            .groupby([pd.Grouper(freq=frequency), 'Product'], observed=True)
+            .size()
+            .unstack(fill_value=0)
+        )
+        
+        if products is not None:
+            time_series = time_series.reindex(columns=products, fill_value=0)
         
         return time_series
     
     def get_frequently_bought_together(self, min_cooccurrence=10):
         """Get products that are frequently bought together"""
         cooccurrence_matrix = self.get_product_cooccurrence_matrix()
-        
-        # Get pairs with minimum co-occurrence
-        pairs = []
-        products = cooccurrence_matrix.index
-        
-        for i, product1 in enumerate(products):
-            for j, product2 in enumerate(products):
-                if i < j:  # Avoid duplicates
-                    cooccurrence = cooccurrence_matrix.loc[product1, product2]
-                    if cooccurrence >= min_cooccurrence:
-                        pairs.append({
-                            'Product1': product1,
-                            'Product2': product2,
-                            'Cooccurrence': cooccurrence,
-                            'Category1': self.product_categories.get(product1, 'Unknown'),
-                            'Category2': self.product_categories.get(product2, 'Unknown')
-                        })
+        products = cooccurrence_matrix.index.to_numpy()
+        
+        # Nonzero upper-triangle pairs (avoids duplicates), built once; thresholding is O(nnz)
+        if self._cooccurrence_pairs is None:
+            self._cooccurrence_pairs = coo_matrix(triu(csr_matrix(cooccurrence_matrix.to_numpy()), k=1))
+        pairs = self._cooccurrence_pairs
+        mask = pairs.data >= min_cooccurrence
+        
+        categories = pd.Series(self.product_categories)
+        pairs_df = pd.DataFrame({
+            'Product1': products[pairs.row[mask]],
+            'Product2': products[pairs.col[mask]],
+            'Cooccurrence': pairs.data[mask]
+        })
+        pairs_df['Category1'] = pairs_df['Product1'].map(categories).fillna('Unknown')
+        pairs_df['Category2'] = pairs_df['Product2'].map(categories).fillna('Unknown')
         
         # Sort by co-occurrence
-        pairs_df = pd.DataFrame(pairs).sort_values('Cooccurrence', ascending=False)
+        pairs_df = pairs_df.sort_values('Cooccurrence', ascending=False)
         
         return pairs_df
     
-    @lru_cache(maxsize=1)
     def get_global_insights(self):
         """Get key performance indicators for the dashboard"""
+        if self._global_insights is not None:
+            return self._global_insights
+        
         if self.df is None:
             self.load_data()
         
         baskets = self.get_basket_data()
         
-        insights = {
+        self._global_insights = {
             'total_transactions': len(self.df),
             'unique_customers': self.df['CustomerID'].nunique(),
             'unique_products': self.df['Product'].nunique(),
@@ -194,22 +282,39 @@ class DataProcessor:
             'top_categories': self.df['Category'].value_counts().head(5).to_dict()
         }
         
-        return insights
+        return self._global_insights
     
     def filter_data_by_date_range(self, start_date, end_date):
-        """Filter data by date range"""
+        """Filter data by date range (returns a slice of the loaded data; copy it before mutating)"""
         if self.df is None:
             self.load_data()
         
-        mask = (self.df['Date'] >= start_date) & (self.df['Date'] <= end_date)
-        return self.df[mask].copy()
+        dates = self.df['Date'].to_numpy()
+        start = np.searchsorted(dates, pd.Timestamp(start_date).to_datetime64(), side='left')
+        end = np.searchsorted(dates, pd.Timestamp(end_date).to_datetime64(), side='right')
+        return self.df.iloc[start:end]
     
     def get_customer_purchase_history(self, customer_id):
         """Get purchase history for a specific customer"""
+        # Resolve rows first: it loads the data on first use, before self.df is read
+        rows = self._get_customer_rows(customer_id)
+        return self.df.take(rows)
+    
+    def get_customer_purchase_histories(self, customer_ids):
+        """Get purchase histories for several customers, concatenated in the given order"""
+        if self.df is None:
+            self.load_data()
+        
+        rows = [self._get_customer_rows(customer_id) for customer_id in customer_ids]
+        return self.df.take(np.concatenate(rows) if rows else np.empty(0, dtype=np.intp))
+    
+    def _get_customer_rows(self, customer_id):
+        """Row positions of a customer's transactions (already in date order)"""
         if self.df is None:
             self.load_data()
         
-        customer_data = self.df[self.df['CustomerID'] == customer_id].copy()
-        customer_data = customer_data.sort_values('Date')
+        # Row positions per customer, built once
+        if self._customer_indices is None:
+            self._customer_indices = self.df.groupby('CustomerID', sort=False).indices
         
-        return customer_data
+        return self._customer_indices.get(customer_id, np.empty(0, dtype=np.intp))
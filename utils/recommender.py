@@ -5,75 +5,201 @@ This module implements various recommendation algorithms including
 collaborative filtering, content-based filtering, and hybrid approaches.
 """
 
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import TruncatedSVD
-from sklearn.preprocessing import StandardScaler
-from scipy.sparse import csr_matrix
+from scipy.sparse import save_npz, load_npz
 import warnings
 warnings.filterwarnings('ignore')
 
 class FreshCartRecommender:
     """Main recommendation engine for FreshCart"""
     
+    # Bump whenever fitting changes what save() writes so older model files are refitted
+    MODEL_FORMAT_VERSION = 1
+    
     def __init__(self, data_processor):
         self.data_processor = data_processor
         self.customer_product_matrix = None
+        self.customer_index = None
+        self.product_index = None
         self.product_cooccurrence_matrix = None
         self.product_similarity_matrix = None
         self.customer_similarity_matrix = None
         self.svd_model = None
-        self.scaler = StandardScaler()
+        
+        # Positional lookups for request-time scoring
+        self._product_ids = None
+        self._products = None
+        self._similarity_values = None
+        self._cooccurrence_values = None
+        self._customer_products = None
+        self._customer_similarity_values = None
         
     def fit(self):
         """Fit the recommendation models"""
         print("Fitting recommendation models...")
         
         # Get matrices
-        self.customer_product_matrix = self.data_processor.get_customer_product_matrix()
+        (self.customer_product_matrix,
+         self.customer_index,
+         self.product_index) = self.data_processor.get_customer_product_matrix()
         self.product_cooccurrence_matrix = self.data_processor.get_product_cooccurrence_matrix()
         
-        # Calculate similarity matrices
-        self._calculate_product_similarity()
-        self._calculate_customer_similarity()
+        # Similarities and SVD only read the base matrices, so run them side by side.
+        # Overlap is partial: the dense BLAS/LAPACK calls release the GIL, but the
+        # sparse matmul and Python-level normalisation in customer similarity do not
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(self._calculate_product_similarity),
+                executor.submit(self._calculate_customer_similarity),
+                executor.submit(self._fit_svd_model)  # SVD for collaborative filtering
+            ]
+            for future in futures:
+                future.result()
+        
+        self._build_lookup_arrays()
         
-        # Fit SVD for collaborative filtering
-        self._fit_svd_model()
+        # Warm the product statistics used by the popularity recommenders
+        self.data_processor.get_product_stats()
         
         print("Models fitted successfully!")
     
+    def save(self, path):
+        """
+        Persist fitted matrices so later runs can memory-map them instead of refitting
+        
+        Args:
+            path: Directory to write the model files to
+        """
+        os.makedirs(path, exist_ok=True)
+        
+        save_npz(os.path.join(path, 'customer_product_matrix.npz'), self.customer_product_matrix, compressed=False)
+        np.save(os.path.join(path, 'product_cooccurrence_matrix.npy'), self.product_cooccurrence_matrix.to_numpy())
+        np.save(os.path.join(path, 'product_similarity_matrix.npy'), self.product_similarity_matrix.to_numpy())
+        np.save(os.path.join(path, 'customer_similarity_matrix.npy'), self.customer_similarity_matrix.to_numpy())
+        np.save(os.path.join(path, 'products.npy'), np.asarray(self.product_index, dtype=str))
+        np.save(os.path.join(path, 'customers.npy'), self.customer_index.to_numpy())
+        
+        # Written last so an interrupted save is never picked up by load()
+        with open(os.path.join(path, 'metadata.json'), 'w') as f:
+            json.dump({
+                'format': self.MODEL_FORMAT_VERSION,
+                'source': self.data_processor.get_source_signature()
+            }, f)
+    
+    def load(self, path):
+        """
+        Load matrices written by save(), memory-mapping the dense arrays
+        
+        Args:
+            path: Directory the model files were saved to
+        
+        Returns:
+            True if a saved model for the current data file was loaded, False otherwise
+        """
+        try:
+            with open(os.path.join(path, 'metadata.json')) as f:
+                metadata = json.load(f)
+            
+            # Saved model is stale if it came from other fitting code or the transaction file changed since
+            if metadata.get('format') != self.MODEL_FORMAT_VERSION:
+                return False
+            if metadata.get('source') != self.data_processor.get_source_signature():
+                return False
+            
+            # Read everything before assigning so a broken file leaves the recommender untouched
+            products = pd.Index(np.load(os.path.join(path, 'products.npy')).tolist())
+            customers = pd.Index(np.load(os.path.join(path, 'customers.npy')))
+            customer_product_matrix = load_npz(os.path.join(path, 'customer_product_matrix.npz')).tocsr()
+            cooccurrence = np.load(os.path.join(path, 'product_cooccurrence_matrix.npy'), mmap_mode='r')
+            product_similarity = np.load(os.path.join(path, 'product_similarity_matrix.npy'), mmap_mode='r')
+            customer_similarity = np.load(os.path.join(path, 'customer_similarity_matrix.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return False  # Missing or corrupt files: the caller refits
+        
+        self.customer_product_matrix = customer_product_matrix
+        self.customer_index = customers
+        self.product_index = products
+        self.product_cooccurrence_matrix = pd.DataFrame(cooccurrence, index=products, columns=products)
+        self.product_similarity_matrix = pd.DataFrame(product_similarity, index=products, columns=products)
+        self.customer_similarity_matrix = pd.DataFrame(customer_similarity, index=customers, columns=customers)
+        
+        # svd_model is not persisted; nothing reads it at serving time, so only fit() sets it
+        self._build_lookup_arrays()
+        
+        print(f"Loaded fitted models from {path}")
+        return True
+    
+    def _build_lookup_arrays(self):
+        """Cache plain arrays and a label -> position map to avoid pandas lookups per request"""
+        self._products = self.product_similarity_matrix.index.to_numpy()
+        self._product_ids = {product: i for i, product in enumerate(self._products)}
+        self._similarity_values = self.product_similarity_matrix.to_numpy(dtype=np.float32)
+        self._cooccurrence_values = self.product_cooccurrence_matrix.to_numpy(dtype=np.int32)
+        
+        # Purchased product ids per customer, split straight from the CSR rows
+        matrix = self.customer_product_matrix
+        self._customer_products = np.split(matrix.indices, matrix.indptr[1:-1])
+        self._customer_similarity_values = self.customer_similarity_matrix.to_numpy(dtype=np.float32)
+    
     def _calculate_product_similarity(self):
         """Calculate product similarity based on co-occurrence"""
-        # Normalize co-occurrence matrix by product popularity
-        product_counts = self.product_cooccurrence_matrix.sum(axis=1)
-        normalized_matrix = self.product_cooccurrence_matrix.div(product_counts, axis=0)
+        # Cosine similarity L2-normalizes each row, which already absorbs any
+        # per-product popularity scaling, so the raw counts are used directly
+        cooccurrence = self.product_cooccurrence_matrix.to_numpy(dtype=np.float32)
         
         # Calculate cosine similarity
         self.product_similarity_matrix = pd.DataFrame(
-            cosine_similarity(normalized_matrix),
-            index=normalized_matrix.index,
-            columns=normalized_matrix.index
+            cosine_similarity(cooccurrence).astype(np.float32, copy=False),
+            index=self.product_cooccurrence_matrix.index,
+            columns=self.product_cooccurrence_matrix.index
         )
     
     def _calculate_customer_similarity(self):
         """Calculate customer similarity based on purchase patterns"""
-        # Calculate cosine similarity between customers
+        # Calculate cosine similarity between customers (float32 in, float32 out)
         self.customer_similarity_matrix = pd.DataFrame(
-            cosine_similarity(self.customer_product_matrix),
-            index=self.customer_product_matrix.index,
-            columns=self.customer_product_matrix.index
+            cosine_similarity(self.customer_product_matrix.astype(np.float32, copy=False)).astype(np.float32, copy=False),
+            index=self.customer_index,
+            columns=self.customer_index
         )
     
     def _fit_svd_model(self):
         """Fit SVD model for collaborative filtering"""
-        # Convert to sparse matrix for efficiency
-        sparse_matrix = csr_matrix(self.customer_product_matrix.values)
-        
-        # Fit SVD with components <= number of products
-        n_components = min(15, sparse_matrix.shape[1] - 1)  # Use 15 or fewer components
+        # Fit SVD with components <= number of products (works on the sparse matrix directly)
+        n_components = min(15, self.customer_product_matrix.shape[1] - 1)  # Use 15 or fewer components
         self.svd_model = TruncatedSVD(n_components=n_components, random_state=42)
-        self.svd_model.fit(sparse_matrix)
+        self.svd_model.fit(self.customer_product_matrix)
+    
+    @staticmethod
+    def _top_k(scores, k, exclude=None, candidates=None):
+        """
+        Get positions of the k highest scores, best first
+        
+        Uses np.argpartition so only the selected k entries are sorted.
+        
+        Args:
+            scores: 1-D array of scores
+            k: Number of positions to return
+            exclude: Position(s) to leave out
+            candidates: Positions to choose from (defaults to all)
+        """
+        if candidates is None:
+            candidates = np.arange(len(scores))
+        if exclude is not None:
+            candidates = candidates[~np.isin(candidates, exclude)]
+        
+        k = min(k, len(candidates))
+        if k <= 0:
+            return candidates[:0]
+        
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return top[np.argsort(-scores[top], kind='stable')]
     
     def get_product_recommendations(self, product, n_recommendations=5, method='hybrid'):
         """
@@ -84,7 +210,7 @@ class FreshCartRecommender:
             n_recommendations: Number of recommendations to return
             method: 'similarity', 'cooccurrence', or 'hybrid'
         """
-        if product not in self.product_similarity_matrix.index:
+        if product not in self._product_ids:
             return []
         
         if method == 'similarity':
@@ -98,33 +224,39 @@ class FreshCartRecommender:
     
     def _get_similarity_recommendations(self, product, n_recommendations):
         """Get recommendations based on product similarity"""
-        similarities = self.product_similarity_matrix[product].sort_values(ascending=False)
+        product_id = self._product_ids[product]
+        similarities = self._similarity_values[product_id]
         # Exclude the product itself
-        similarities = similarities.drop(product)
+        top = self._top_k(similarities, n_recommendations, exclude=product_id)
         
+        categories = self.data_processor.product_categories
         recommendations = []
-        for similar_product, similarity in similarities.head(n_recommendations).items():
+        for similar_product, similarity in zip(self._products[top], similarities[top]):
             recommendations.append({
                 'product': similar_product,
                 'score': similarity,
-                'method': 'similarity'
+                'method': 'similarity',
+                'category': categories.get(similar_product, 'Unknown')
             })
         
         return recommendations
     
     def _get_cooccurrence_recommendations(self, product, n_recommendations):
         """Get recommendations based on co-occurrence frequency"""
-        cooccurrences = self.product_cooccurrence_matrix[product].sort_values(ascending=False)
+        product_id = self._product_ids[product]
+        cooccurrences = self._cooccurrence_values[product_id]
         # Exclude the product itself
-        cooccurrences = cooccurrences.drop(product)
+        top = self._top_k(cooccurrences, n_recommendations, exclude=product_id)
         
+        categories = self.data_processor.product_categories
         recommendations = []
-        for co_product, count in cooccurrences.head(n_recommendations).items():
+        for co_product, count in zip(self._products[top], cooccurrences[top]):
             if count > 0:
                 recommendations.append({
                     'product': co_product,
                     'score': count,
-                    'method': 'cooccurrence'
+                    'method': 'cooccurrence',
+                    'category': categories.get(co_product, 'Unknown')
                 })
         
         return recommendations
@@ -158,49 +290,47 @@ class FreshCartRecommender:
     
     def get_customer_recommendations(self, customer_id, n_recommendations=5):
         """Get recommendations for a specific customer using collaborative filtering - optimized"""
-        if customer_id not in self.customer_product_matrix.index:
+        if customer_id not in self.customer_index:
             return []
         
-        # Get customer's purchase history
-        customer_products = set(self.customer_product_matrix.loc[customer_id][
-            self.customer_product_matrix.loc[customer_id] == 1
-        ].index)
+        # Get customer's purchase history (sorted product ids)
+        customer_row = self.customer_index.get_loc(customer_id)
+        customer_products = self._customer_products[customer_row]
         
         # Use only top 5 similar customers for faster performance
-        customer_similarities = self.customer_similarity_matrix[customer_id].sort_values(ascending=False)
-        customer_similarities = customer_similarities.drop(customer_id).head(5)
+        customer_similarities = self._customer_similarity_values[customer_row]
+        similar_customers = self._top_k(customer_similarities, 5, exclude=customer_row)
         
-        # Get products from similar customers more efficiently
-        product_scores = {}
-        for similar_customer, similarity in customer_similarities.items():
+        # Score products from similar customers into a vector indexed by product id
+        product_scores = np.zeros(len(self.product_index))
+        for similar_row in similar_customers:
+            similarity = customer_similarities[similar_row]
             # Skip very dissimilar customers
             if similarity < 0.2:
                 continue
-                
-            similar_products = set(self.customer_product_matrix.loc[similar_customer][
-                self.customer_product_matrix.loc[similar_customer] == 1
-            ].index)
             
-            # Score products based on similarity
-            for product in similar_products:
-                if product not in customer_products:  # Don't recommend already purchased
-                    if product not in product_scores:
-                        product_scores[product] = 0
-                    product_scores[product] += similarity
+            similar_products = self._customer_products[similar_row]
+            
+            # Don't recommend already purchased
+            candidates = np.setdiff1d(similar_products, customer_products, assume_unique=True)
+            np.add.at(product_scores, candidates, similarity)
         
         # If no collaborative recommendations, fall back to popular products
-        if not product_scores:
+        scored = np.flatnonzero(product_scores)
+        if len(scored) == 0:
             return self.get_popular_products(n_recommendations)
         
         # Sort and return top recommendations
-        sorted_products = sorted(product_scores.items(), key=lambda x: x[1], reverse=True)
+        top = self._top_k(product_scores, n_recommendations, candidates=scored)
         
+        categories = self.data_processor.product_categories
         recommendations = []
-        for product, score in sorted_products[:n_recommendations]:
+        for product, score in zip(self.product_index[top], product_scores[top]):
             recommendations.append({
                 'product': product,
                 'score': score,
-                'method': 'collaborative'
+                'method': 'collaborative',
+                'category': categories.get(product, 'Unknown')
             })
         
         return recommendations
@@ -210,38 +340,32 @@ class FreshCartRecommender:
         if not basket_products:
             return []
         
-        # Limit basket size for performance (max 3 products)
-        basket_products = basket_products[:3]
-        
-        # Get recommendations for each product in basket
-        all_recommendations = {}
-        
-        for product in basket_products:
-            if product in self.product_cooccurrence_matrix.index:
-                # Use direct co-occurrence lookup for faster performance
-                cooccurrences = self.product_cooccurrence_matrix[product].sort_values(ascending=False)
-                cooccurrences = cooccurrences.drop(product)  # Remove self
-                
-                # Add top co-occurring products
-                for co_product, score in cooccurrences.head(5).items():
-                    if co_product not in basket_products:  # Don't recommend products already in basket
-                        if co_product not in all_recommendations:
-                            all_recommendations[co_product] = 0
-                        all_recommendations[co_product] += score
+        basket_ids = np.unique(np.array(
+            [self._product_ids[product] for product in basket_products if product in self._product_ids],
+            dtype=np.intp
+        ))
+        
+        # Sum the co-occurrence rows of every basket product into one score vector
+        product_scores = self._cooccurrence_values[basket_ids].sum(axis=0)
+        
+        # Don't recommend products already in basket
+        scored = np.setdiff1d(np.flatnonzero(product_scores), basket_ids, assume_unique=True)
         
         # If no recommendations found, return popular products
-        if not all_recommendations:
+        if len(scored) == 0:
             return self.get_popular_products(n_recommendations)
         
         # Sort by combined score
-        sorted_products = sorted(all_recommendations.items(), key=lambda x: x[1], reverse=True)
+        top = self._top_k(product_scores, n_recommendations, candidates=scored)
         
+        categories = self.data_processor.product_categories
         recommendations = []
-        for product, score in sorted_products[:n_recommendations]:
+        for product, score in zip(self._products[top], product_scores[top]):
             recommendations.append({
                 'product': product,
                 'score': score,
-                'method': 'basket_hybrid'
+                'method': 'basket_hybrid',
+                'category': categories.get(product, 'Unknown')
             })
         
         return recommendations
@@ -253,14 +377,16 @@ class FreshCartRecommender:
         if category:
             product_stats = product_stats[product_stats['Category'] == category]
         
-        popular_products = product_stats.head(n_products)
+        popular_products = product_stats['TotalTransactions'].head(n_products)
         
+        categories = self.data_processor.product_categories
         recommendations = []
-        for product, stats in popular_products.iterrows():
+        for product, total in popular_products.items():
             recommendations.append({
                 'product': product,
-                'score': stats['TotalTransactions'],
-                'method': 'popularity'
+                'score': total,
+                'method': 'popularity',
+                'category': categories.get(product, 'Unknown')
             })
         
         return recommendations
@@ -268,14 +394,16 @@ class FreshCartRecommender:
     def get_category_recommendations(self, category, n_recommendations=5):
         """Get recommendations within a specific category"""
         product_stats = self.data_processor.get_product_stats()
-        category_products = product_stats[product_stats['Category'] == category]
+        category_products = product_stats.loc[product_stats['Category'] == category, 'TotalTransactions']
         
+        categories = self.data_processor.product_categories
         recommendations = []
-        for product, stats in category_products.head(n_recommendations).iterrows():
+        for product, total in category_products.head(n_recommendations).items():
             recommendations.append({
                 'product': product,
-                'score': stats['TotalTransactions'],
-                'method': 'category_popularity'
+                'score': total,
+                'method': 'category_popularity',
+                'category': categories.get(product, 'Unknown')
             })
         
         return recommendations
@@ -284,15 +412,17 @@ class FreshCartRecommender:
         """Provide explanation for why a product was recommended"""
         explanations = []
         
-        # Check co-occurrence
-        if product in self.product_cooccurrence_matrix.index and recommended_product in self.product_cooccurrence_matrix.columns:
-            cooccurrence = self.product_cooccurrence_matrix.loc[product, recommended_product]
+        product_id = self._product_ids.get(product)
+        recommended_id = self._product_ids.get(recommended_product)
+        
+        if product_id is not None and recommended_id is not None:
+            # Check co-occurrence
+            cooccurrence = self._cooccurrence_values[product_id, recommended_id]
             if cooccurrence > 0:
                 explanations.append(f"Frequently bought together ({cooccurrence} times)")
-        
-        # Check similarity
-        if product in self.product_similarity_matrix.index and recommended_product in self.product_similarity_matrix.columns:
-            similarity = self.product_similarity_matrix.loc[product, recommended_product]
+            
+            # Check similarity
+            similarity = self._similarity_values[product_id, recommended_id]
             if similarity > 0.3:
                 explanations.append(f"Similar purchase patterns (similarity: {similarity:.2f})")
         
@@ -5,22 +5,56 @@ This module provides various visualization functions for the dashboard
 including charts, graphs, and interactive visualizations.
 """
 
+import os
+import json
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
-import plotly.figure_factory as ff
-import seaborn as sns
-import matplotlib.pyplot as plt
-import networkx as nx
-from collections import defaultdict
+from functools import wraps, cached_property
 import warnings
 warnings.filterwarnings('ignore')
 
+# orjson makes figure serialization much faster; fall back to plotly's default engine without it
+try:
+    import orjson  # noqa: F401
+    _JSON_ENGINE = 'orjson'
+except ImportError:
+    _JSON_ENGINE = None
+
+def _cached_figure(method):
+    """Memoize a chart builder by its arguments until the processor reloads its data"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._cache_version != self.data_processor.version:
+            self.clear_cache()
+        
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        fig = self._figure_cache.get(key)
+        if fig is None:
+            fig = self._figure_cache[key] = method(self, *args, **kwargs)
+        return fig
+    return wrapper
+
 class FreshCartVisualizer:
     """Handles all visualizations for the FreshCart dashboard"""
     
+    # Line colors for the monthly trends, copied once from plotly's qualitative palette
+    _SET1 = list(px.colors.qualitative.Set1)
+    
+    # Charts that take no arguments and can be pre-rendered by warm_cache()
+    WARM_CHARTS = (
+        'create_category_distribution_chart',
+        'create_basket_size_distribution',
+        'create_monthly_trends',
+        'create_category_performance'
+    )
+    
+    # Bump whenever any WARM_CHARTS builder changes so previously rendered files are ignored
+    WARM_FORMAT_VERSION = 1
+    
     def __init__(self, data_processor):
         self.data_processor = data_processor
         self.colors = {
@@ -42,201 +76,313 @@ class FreshCartVisualizer:
             'Meat & Dairy': '#FFB6C1',
             'Household': '#87CEEB'
         }
-    
-    def create_top_products_chart(self, n_products=10):
-        """Create bar chart of top-selling products"""
-        product_stats = self.data_processor.get_product_stats()
-        top_products = product_stats.head(n_products)
-        
-        fig = px.bar(
-            x=top_products['TotalTransactions'],
-            y=top_products.index,
-            orientation='h',
-            title=f'Top {n_products} Products by Sales',
-            labels={'x': 'Total Transactions', 'y': 'Product'},
-            color=top_products['Category'],
-            color_discrete_map=self.category_colors
+        
+        # Fixed layout keys of the network chart, applied in one update
+        self._network_layout = dict(
+            xaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
+            yaxis=dict(showticklabels=False, showgrid=False, zeroline=False),
+            hovermode='closest',
+            showlegend=False
         )
         
-        fig.update_layout(
+        # Recommendation method colors
+        self.method_colors = {
+            'similarity': self.colors['primary'],
+            'cooccurrence': self.colors['secondary'],
+            'hybrid': self.colors['accent'],
+            'collaborative': self.colors['success'],
+            'popularity': self.colors['warning']
+        }
+        
+        # Static part of the KPI cards: (value template over the insights dict, card fields)
+        self._kpi_template = (
+            ('{total_transactions:,}',
+             {'title': 'Total Transactions', 'icon': '📊', 'color': self.colors['primary']}),
+            ('{unique_customers:,}',
+             {'title': 'Unique Customers', 'icon': '👥', 'color': self.colors['secondary']}),
+            ('{unique_products}',
+             {'title': 'Unique Products', 'icon': '🛒', 'color': self.colors['accent']}),
+            ('{avg_basket_size:.1f}',
+             {'title': 'Avg Basket Size', 'icon': '📦', 'color': self.colors['success']})
+        )
+        
+        # Layout shared by every chart; builders only set what differs
+        self._base_layout = go.Layout(
             height=400,
-            showlegend=True,
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)',
             font=dict(size=12),
             title_font_size=16
         )
         
-        fig.update_traces(marker_line_width=0)
+        self._figure_cache = {}
+        self._empty_figures = {}
+        self._warm_figures = {}
+        self._cache_version = data_processor.version
+    
+    def clear_cache(self):
+        """Drop memoized figures so the next call rebuilds them from current data"""
+        self._figure_cache.clear()
+        self._warm_figures.clear()
+        self.__dict__.pop('_product_stats', None)
+        self._cache_version = self.data_processor.version
+    
+    @cached_property
+    def _product_stats(self):
+        """Product statistics (sorted by sales) fetched once and shared by every chart"""
+        return self.data_processor.get_product_stats()
+    
+    def _get_top_products(self, n):
+        """Top n products by sales, sliced from the shared product statistics"""
+        if self._cache_version != self.data_processor.version:
+            self.clear_cache()
+        
+        return self._product_stats.iloc[:n]
+    
+    def _empty_figure(self, message, height=400):
+        """Placeholder figure with a centered message, built once per message and height"""
+        key = (message, height)
+        if key not in self._empty_figures:
+            fig = go.Figure()
+            fig.add_annotation(
+                text=message,
+                xref="paper", yref="paper",
+                x=0.5, y=0.5, showarrow=False,
+                font=dict(size=16)
+            )
+            fig.update_layout(
+                height=height,
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)'
+            )
+            self._empty_figures[key] = fig
+        return self._empty_figures[key]
+    
+    @staticmethod
+    def _to_json(fig):
+        """Serialize a figure (with orjson when available), skipping plotly's validation pass"""
+        return pio.to_json(fig, validate=False, engine=_JSON_ENGINE)
+    
+    def warm_cache(self, out_dir):
+        """
+        Pre-render the argument-free charts to JSON files the dashboard can serve as-is
+        
+        Args:
+            out_dir: Directory to write the chart files to
+            
+        Returns:
+            Dictionary mapping each WARM_CHARTS name to its figure dict
+        """
+        figures = {name: getattr(self, name)().to_dict() for name in self.WARM_CHARTS}
+        # Kept in memory first so warm_figure() serves them even if writing fails
+        self._warm_figures.update(figures)
+        
+        os.makedirs(out_dir, exist_ok=True)
+        for name, fig in figures.items():
+            with open(os.path.join(out_dir, f'{name}.json'), 'w') as f:
+                f.write(self._to_json(fig))
+        
+        # Written last so an interrupted warm-up is never mistaken for a fresh one
+        with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+            json.dump({
+                'format': self.WARM_FORMAT_VERSION,
+                'source': self.data_processor.get_source_signature()
+            }, f)
+        
+        return figures
+    
+    def load_warm_figure(self, out_dir, name):
+        """
+        Load a chart written by warm_cache()
+        
+        Args:
+            out_dir: Directory the chart files were written to
+            name: Chart method name, one of WARM_CHARTS
+            
+        Returns:
+            Figure dict, or None if the file is missing, older than the data
+            or rendered by a different version of the chart builders
+        """
+        try:
+            with open(os.path.join(out_dir, 'manifest.json')) as f:
+                manifest = json.load(f)
+            if manifest.get('format') != self.WARM_FORMAT_VERSION:
+                return None
+            if manifest.get('source') != self.data_processor.get_source_signature():
+                return None
+            with open(os.path.join(out_dir, f'{name}.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def warm_figure(self, out_dir, name):
+        """
+        Get one of WARM_CHARTS as a figure dict, whichever way it is cheapest to obtain
         
+        Args:
+            out_dir: Directory warm_cache() writes the chart files to
+            name: Chart method name, one of WARM_CHARTS
+            
+        Returns:
+            Figure dict from memory, from the pre-rendered file, or freshly built
+        """
+        if self._cache_version != self.data_processor.version:
+            self.clear_cache()
+        
+        fig = self._warm_figures.get(name)
+        if fig is None:
+            fig = self.load_warm_figure(out_dir, name)
+            if fig is None:
+                fig = getattr(self, name)().to_dict()
+            self._warm_figures[name] = fig
         return fig
     
+    @_cached_figure
+    def create_top_products_chart(self, n_products=10):
+        """Create bar chart of top-selling products"""
+        top_products = self._get_top_products(n_products)
+        
+        # One trace per category (in order of appearance) so the legend doubles as a category key
+        fig = go.Figure(data=[
+            go.Bar(
+                x=group['TotalTransactions'].to_numpy().astype(np.int32, copy=False),
+                y=group.index.to_numpy(),
+                orientation='h',
+                name=category,
+                marker=dict(color=self.category_colors.get(category), line_width=0),
+                hovertemplate='%{y}<br>Total Transactions: %{x}<extra></extra>'
+            )
+            for category, group in top_products.groupby('Category', sort=False)
+        ], layout=self._base_layout)
+        
+        fig.update_layout(
+            title_text=f'Top {n_products} Products by Sales',
+            xaxis_title='Total Transactions',
+            yaxis_title='Product',
+            barmode='relative',
+            showlegend=True
+        )
+        
+        return fig
+    
+    @_cached_figure
     def create_category_distribution_chart(self):
         """Create pie chart of category distribution"""
-        category_stats = self.data_processor.get_product_stats()
-        category_counts = category_stats['Category'].value_counts()
+        category_counts = self.data_processor.get_category_sizes()
         
         fig = px.pie(
-            values=category_counts.values,
+            values=category_counts.to_numpy().astype(np.int32, copy=False),
             names=category_counts.index,
             title='Product Distribution by Category',
             color_discrete_map=self.category_colors
         )
         
-        fig.update_layout(
-            height=400,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            title_font_size=16
-        )
+        fig.update_layout(self._base_layout)
         
         return fig
     
+    @_cached_figure
     def create_cooccurrence_heatmap(self, top_n=15):
         """Create heatmap of product co-occurrences"""
         cooccurrence_matrix = self.data_processor.get_product_cooccurrence_matrix()
         
         # Get top products by total transactions
-        product_stats = self.data_processor.get_product_stats()
-        top_products = product_stats.head(top_n).index.tolist()
-        
-        # Filter matrix to top products
-        filtered_matrix = cooccurrence_matrix.loc[top_products, top_products]
-        
-        fig = px.imshow(
-            filtered_matrix.values,
-            x=filtered_matrix.columns,
-            y=filtered_matrix.index,
-            color_continuous_scale='Blues',
-            title=f'Product Co-occurrence Heatmap (Top {top_n} Products)',
-            labels=dict(x="Product", y="Product", color="Co-occurrences")
-        )
+        top_products = self._get_top_products(top_n).index.tolist()
+        
+        # Filter matrix to top products by position
+        positions = cooccurrence_matrix.index.get_indexer(top_products)
+        filtered_counts = cooccurrence_matrix.to_numpy()[np.ix_(positions, positions)]
+        
+        fig = go.Figure(go.Heatmap(
+            z=filtered_counts,
+            x=top_products,
+            y=top_products,
+            colorscale='Blues',
+            colorbar=dict(title='Co-occurrences'),
+            hovertemplate='%{y} × %{x}: %{z}<extra></extra>'
+        ), layout=self._base_layout)
         
         fig.update_layout(
+            title_text=f'Product Co-occurrence Heatmap (Top {top_n} Products)',
+            xaxis=dict(title='Product', constrain='domain'),
+            yaxis=dict(title='Product', autorange='reversed', scaleanchor='x', constrain='domain'),
             height=500,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=10),
-            title_font_size=16
+            font_size=10
         )
         
         return fig
     
+    @_cached_figure
     def create_network_graph(self, min_cooccurrence=20):
         """Create a simple network graph that works reliably in deployment"""
-        try:
-            # Get frequently bought together data
-            frequently_bought_together = self.data_processor.get_frequently_bought_together(min_cooccurrence)
-            
-            if frequently_bought_together.empty:
-                # Return a simple bar chart instead of network graph
-                return self._create_simple_network_chart(frequently_bought_together, min_cooccurrence)
-            
-            # Limit to top 10 relationships for simplicity
-            top_relationships = frequently_bought_together.head(10)
-            
-            # Create a simple scatter plot showing relationships
-            fig = go.Figure()
-            
-            # Add relationship lines
-            for _, row in top_relationships.iterrows():
-                fig.add_trace(go.Scatter(
-                    x=[row['Product1'], row['Product2']],
-                    y=[1, 1],
-                    mode='lines+markers',
-                    line=dict(width=2, color='#888'),
-                    marker=dict(size=8),
-                    showlegend=False,
-                    hoverinfo='text',
-                    hovertext=f"{row['Product1']} ↔ {row['Product2']}<br>Co-occurrences: {row['Cooccurrence']}"
-                ))
-            
-            # Update layout
-            fig.update_layout(
-                title=f'Product Relationships (Min Co-occurrence: {min_cooccurrence})',
-                xaxis=dict(showticklabels=False, showgrid=False),
-                yaxis=dict(showticklabels=False, showgrid=False),
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                height=400,
-                showlegend=False
-            )
-            
-            return fig
-            
-        except Exception as e:
-            # Fallback to simple bar chart
-            try:
-                frequently_bought_together = self.data_processor.get_frequently_bought_together(min_cooccurrence)
-                return self._create_simple_network_chart(frequently_bought_together, min_cooccurrence)
-            except Exception:
-                # Final fallback - empty figure
-                fig = go.Figure()
-                fig.add_annotation(
-                    text="Network visualization temporarily unavailable",
-                    xref="paper", yref="paper",
-                    x=0.5, y=0.5, showarrow=False,
-                    font=dict(size=16)
-                )
-                fig.update_layout(
-                    height=400,
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)'
-                )
-                return fig
-    
-    def _create_simple_network_chart(self, data, min_cooccurrence):
-        """Create a simple bar chart as network graph alternative"""
-        if data.empty:
-            fig = go.Figure()
-            fig.add_annotation(
-                text="No products meet the co-occurrence threshold",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False,
-                font=dict(size=16)
-            )
-        else:
-            # Create horizontal bar chart
-            fig = px.bar(
-                data.head(10),
-                x='Cooccurrence',
-                y='Product1',
-                orientation='h',
-                title=f'Frequently Bought Together Products (Min: {min_cooccurrence})',
-                labels={'Cooccurrence': 'Times Bought Together', 'Product1': 'Product'}
-            )
+        # Get frequently bought together data
+        frequently_bought_together = self.data_processor.get_frequently_bought_together(min_cooccurrence)
+        
+        if frequently_bought_together.empty:
+            return self._empty_figure("No products meet the co-occurrence threshold")
+        
+        # Limit to top 10 relationships for simplicity
+        top_relationships = frequently_bought_together.head(10)
+        
+        # Draw every relationship as a segment of one trace, separated by None gaps
+        product1 = top_relationships['Product1'].to_numpy()
+        product2 = top_relationships['Product2'].to_numpy()
+        labels = (
+            top_relationships['Product1'] + ' ↔ ' + top_relationships['Product2']
+            + '<br>Co-occurrences: ' + top_relationships['Cooccurrence'].astype(str)
+        ).to_numpy()
+        
+        xs = np.empty(len(product1) * 3, dtype=object)
+        xs[0::3], xs[1::3] = product1, product2
+        hovertext = np.empty(len(product1) * 3, dtype=object)
+        hovertext[0::3], hovertext[1::3] = labels, labels
+        
+        fig = go.Figure(go.Scatter(
+            x=xs,
+            y=np.tile([1, 1, None], len(product1)),
+            mode='lines+markers',
+            line=dict(width=2, color='#888'),
+            marker=dict(size=8),
+            showlegend=False,
+            hoverinfo='text',
+            hovertext=hovertext
+        ), layout=self._base_layout)
         
         fig.update_layout(
-            height=400,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)'
+            title_text=f'Product Relationships (Min Co-occurrence: {min_cooccurrence})',
+            **self._network_layout
         )
+        
         return fig
     
+    @_cached_figure
     def create_basket_size_distribution(self):
         """Create histogram of basket sizes"""
-        baskets = self.data_processor.get_basket_data()
-        
-        fig = px.histogram(
-            baskets,
-            x='BasketSize',
-            nbins=20,
-            title='Distribution of Basket Sizes',
-            labels={'BasketSize': 'Number of Items', 'count': 'Number of Baskets'},
-            color_discrete_sequence=[self.colors['primary']]
-        )
+        sizes = self.data_processor.get_basket_data()['BasketSize'].to_numpy()
+        
+        # Bin in NumPy: one bin per item count when that fits in 20 bins, else 20 equal bins
+        if sizes.max() - sizes.min() < 20:
+            bins = np.arange(sizes.min(), sizes.max() + 2) - 0.5
+        else:
+            bins = 20
+        counts, edges = np.histogram(sizes, bins=bins)
+        
+        fig = go.Figure(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts.astype(np.int32, copy=False),
+            width=np.diff(edges),
+            marker=dict(color=self.colors['primary'], line_width=0),
+            hovertemplate='Number of Items: %{x}<br>Number of Baskets: %{y}<extra></extra>'
+        ), layout=self._base_layout)
         
         fig.update_layout(
-            height=400,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            title_font_size=16
+            title_text='Distribution of Basket Sizes',
+            xaxis_title='Number of Items',
+            yaxis_title='Number of Baskets'
         )
         
         # Add mean line
-        mean_basket_size = baskets['BasketSize'].mean()
+        mean_basket_size = sizes.mean()
         fig.add_vline(
             x=mean_basket_size,
             line_dash="dash",
@@ -247,23 +393,14 @@ class FreshCartVisualizer:
         
         return fig
     
+    @_cached_figure
     def create_customer_activity_timeline(self, n_customers=5):
         """Create timeline of customer activity"""
         customer_stats = self.data_processor.get_customer_stats()
         top_customers = customer_stats.nlargest(n_customers, 'TotalTransactions').index
         
-        timeline_data = []
-        for customer_id in top_customers:
-            customer_data = self.data_processor.get_customer_purchase_history(customer_id)
-            for _, row in customer_data.iterrows():
-                timeline_data.append({
-                    'CustomerID': customer_id,
-                    'Date': row['Date'],
-                    'Product': row['Product'],
-                    'Category': row['Category']
-                })
-        
-        timeline_df = pd.DataFrame(timeline_data)
+        timeline_df = self.data_processor.get_customer_purchase_histories(top_customers)
+        timeline_df = timeline_df[['CustomerID', 'Date', 'Product', 'Category']]
         
         fig = px.scatter(
             timeline_df,
@@ -275,129 +412,86 @@ class FreshCartVisualizer:
             color_discrete_map=self.category_colors
         )
         
-        fig.update_layout(
-            height=400,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            title_font_size=16
-        )
+        fig.update_layout(self._base_layout)
         
         return fig
     
-    def create_recommendation_visualization(self, recommendations, title="Product Recommendations"):
-        """Create visualization for product recommendations"""
+    def create_recommendation_visualization(self, recommendations, title="Product Recommendations", top_k=20):
+        """Create visualization for product recommendations (at most the top_k highest-scoring ones)"""
         if not recommendations:
-            fig = go.Figure()
-            fig.add_annotation(
-                text="No recommendations available",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False,
-                font=dict(size=16)
-            )
-            fig.update_layout(
-                height=300,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)'
-            )
-            return fig
+            return self._empty_figure("No recommendations available", height=300)
         
-        # Prepare data
-        products = [rec['product'] for rec in recommendations]
-        scores = [rec['score'] for rec in recommendations]
-        methods = [rec['method'] for rec in recommendations]
+        # Bound the chart size by keeping only the highest-scoring picks
+        if len(recommendations) > top_k:
+            recommendations = sorted(recommendations, key=lambda rec: rec['score'], reverse=True)[:top_k]
         
-        # Color by method
-        method_colors = {
-            'similarity': self.colors['primary'],
-            'cooccurrence': self.colors['secondary'],
-            'hybrid': self.colors['accent'],
-            'collaborative': self.colors['success'],
-            'popularity': self.colors['warning']
-        }
-        
-        colors = [method_colors.get(method, self.colors['primary']) for method in methods]
+        # Prepare data: group products and scores by method in a single pass
+        by_method = {}
+        for rec in recommendations:
+            method_products, method_scores = by_method.setdefault(rec['method'], ([], []))
+            method_products.append(rec['product'])
+            method_scores.append(rec['score'])
         
-        fig = px.bar(
-            x=scores,
-            y=products,
-            orientation='h',
-            title=title,
-            labels={'x': 'Recommendation Score', 'y': 'Product'},
-            color=methods,
-            color_discrete_map=method_colors
-        )
+        # One trace per method (in order of appearance) so the legend shows where each pick came from
+        fig = go.Figure(data=[
+            go.Bar(
+                x=np.asarray(method_scores, dtype=np.float64),
+                y=method_products,
+                orientation='h',
+                name=method,
+                marker=dict(color=self.method_colors.get(method, self.colors['primary']), line_width=0),
+                hovertemplate='%{y}<br>Recommendation Score: %{x}<extra></extra>'
+            )
+            for method, (method_products, method_scores) in by_method.items()
+        ], layout=self._base_layout)
         
         fig.update_layout(
-            height=max(300, len(products) * 40),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            title_font_size=16,
+            title_text=title,
+            xaxis_title='Recommendation Score',
+            yaxis_title='Product',
+            barmode='relative',
+            height=max(300, len(recommendations) * 40),
             showlegend=True
         )
         
-        fig.update_traces(marker_line_width=0)
-        
         return fig
     
     def create_kpi_cards(self, insights):
         """Create KPI cards for the dashboard"""
-        cards = []
-        
-        kpis = [
-            {
-                'title': 'Total Transactions',
-                'value': f"{insights['total_transactions']:,}",
-                'icon': '📊',
-                'color': self.colors['primary']
-            },
-            {
-                'title': 'Unique Customers',
-                'value': f"{insights['unique_customers']:,}",
-                'icon': '👥',
-                'color': self.colors['secondary']
-            },
-            {
-                'title': 'Unique Products',
-                'value': f"{insights['unique_products']}",
-                'icon': '🛒',
-                'color': self.colors['accent']
-            },
-            {
-                'title': 'Avg Basket Size',
-                'value': f"{insights['avg_basket_size']:.1f}",
-                'icon': '📦',
-                'color': self.colors['success']
-            }
-        ]
-        
-        return kpis
+        return [{**card, 'value': value.format_map(insights)} for value, card in self._kpi_template]
     
+    @_cached_figure
     def create_monthly_trends(self):
         """Create monthly sales trends"""
-        time_series = self.data_processor.get_time_series_data('M')
-        
         # Get top 5 products
-        product_stats = self.data_processor.get_product_stats()
-        top_products = product_stats.head(5).index.tolist()
-        
-        # Filter time series to top products
-        filtered_series = time_series[top_products]
-        
-        fig = px.line(
-            filtered_series,
-            title='Monthly Sales Trends (Top 5 Products)',
-            labels={'value': 'Transactions', 'Date': 'Month'},
-            color_discrete_sequence=px.colors.qualitative.Set1
-        )
+        top_products = self._get_top_products(5).index.tolist()
+        
+        # Only aggregate the rows of the top products
+        filtered_series = self.data_processor.get_time_series_data('M', products=top_products)
+        
+        # Compact int32 counts, one line per product that sold at all
+        months = filtered_series.index.to_numpy()
+        counts = filtered_series.to_numpy(dtype=np.int32)
+        sold = counts.any(axis=0)
+        
+        fig = go.Figure(data=[
+            go.Scatter(
+                x=months,
+                y=counts[:, i],
+                mode='lines',
+                name=product,
+                line_color=self._SET1[i % len(self._SET1)],
+                hovertemplate='%{x|%b %Y}<br>Transactions: %{y}<extra>%{fullData.name}</extra>'
+            )
+            for i, product in enumerate(filtered_series.columns)
+            if sold[i]
+        ], layout=self._base_layout)
         
         fig.update_layout(
-            height=400,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            title_font_size=16,
+            title_text='Monthly Sales Trends (Top 5 Products)',
+            xaxis_title='Month',
+            yaxis_title='Transactions',
+            legend_title_text='Product',
             legend=dict(
                 orientation="h",
                 yanchor="bottom",
@@ -409,14 +503,32 @@ class FreshCartVisualizer:
         
         return fig
     
+    @_cached_figure
     def create_category_performance(self):
         """Create category performance comparison"""
-        category_stats = self.data_processor.get_product_stats()
-        category_performance = category_stats.groupby('Category').agg({
-            'TotalTransactions': 'sum',
-            'UniqueCustomers': 'sum',
-            'AvgTransactionsPerCustomer': 'mean'
-        }).round(2)
+        category_stats = self._product_stats
+        # Sum/mean per category with bincount over integer category codes
+        codes, categories = pd.factorize(category_stats['Category'], sort=True)
+        known = codes >= 0
+        codes = codes[known]
+        n_categories = len(categories)
+        
+        def category_sum(column):
+            values = category_stats[column].to_numpy()[known]
+            return np.bincount(codes, weights=values, minlength=n_categories)
+        
+        category_performance = pd.DataFrame({
+            'TotalTransactions': category_sum('TotalTransactions').astype(np.int64),
+            'UniqueCustomers': category_sum('UniqueCustomers').astype(np.int64),
+            'AvgTransactionsPerCustomer': (
+                category_sum('AvgTransactionsPerCustomer') / np.bincount(codes, minlength=n_categories)
+            )
+        }, index=pd.Index(categories, name='Category')).round(2)
+        
+        # Bar colors per category, built once for both subplots
+        category_names = category_performance.index.tolist()
+        total_colors = [self.category_colors.get(cat, self.colors['primary']) for cat in category_names]
+        average_colors = [self.category_colors.get(cat, self.colors['secondary']) for cat in category_names]
         
         fig = make_subplots(
             rows=1, cols=2,
@@ -430,7 +542,7 @@ class FreshCartVisualizer:
                 x=category_performance.index,
                 y=category_performance['TotalTransactions'],
                 name='Total Transactions',
-                marker_color=[self.category_colors.get(cat, self.colors['primary']) for cat in category_performance.index]
+                marker_color=total_colors
             ),
             row=1, col=1
         )
@@ -441,18 +553,14 @@ class FreshCartVisualizer:
                 x=category_performance.index,
                 y=category_performance['AvgTransactionsPerCustomer'],
                 name='Avg per Customer',
-                marker_color=[self.category_colors.get(cat, self.colors['secondary']) for cat in category_performance.index]
+                marker_color=average_colors
             ),
             row=1, col=2
         )
         
         fig.update_layout(
-            height=400,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
+            self._base_layout,
             title_text="Category Performance Analysis",
-            title_font_size=16,
             showlegend=False
         )
         